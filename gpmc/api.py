@@ -1,4 +1,5 @@
 from typing import Any, IO, Generator, Literal, Sequence
+from http.cookiejar import DefaultCookiePolicy
 import time
 from urllib.parse import parse_qs
 from pathlib import Path
@@ -12,6 +13,8 @@ from .exceptions import UploadRejected
 
 DEFAULT_TIMEOUT = 60
 RETRIES = 10
+# Kept connections per host, enough for concurrent uploads with the default thread counts
+POOL_MAXSIZE = 20
 
 
 class Api:
@@ -35,6 +38,8 @@ class Api:
         self.language = language
         self.auth_data = auth_data
         self.auth_response_cache: dict[str, str] = {"Expiry": "0", "Auth": ""}
+        # Shared by all requests so that connections to Google hosts are kept alive between calls
+        self._session = self._new_session()
 
     @property
     def bearer_token(self) -> str:
@@ -46,11 +51,11 @@ class Api:
         raise RuntimeError("Auth response does not contain bearer token")
 
     def _new_session(self) -> requests.Session:
-        """Create a new request session with retry mechanism"""
+        """Create a new request session with retry mechanism and a pool of kept-alive connections"""
         # https://stackoverflow.com/questions/23267409/how-to-implement-retry-mechanism-into-python-requests-library
         s = requests.Session()
         retries = Retry(total=RETRIES, backoff_factor=1, status_forcelist=[502, 503, 504])
-        adapter = HTTPAdapter(max_retries=retries)
+        adapter = HTTPAdapter(pool_maxsize=POOL_MAXSIZE, max_retries=retries)
         s.mount("http://", adapter)
         s.mount("https://", adapter)
         s.proxies = {
@@ -59,8 +64,14 @@ class Api:
         }
         if self.proxy:
             s.verify = False
+        # Don't carry cookies between requests, each call stays independent as with a fresh session
+        s.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
         return s
 
+    def close(self) -> None:
+        """Close the pooled connections of the api session."""
+        self._session.close()
+
     def _get_auth_token(self) -> dict[str, str]:
         """
         Send auth request to get bearer token.
@@ -100,13 +111,12 @@ class Api:
             "User-Agent": "GoogleAuth/1.4 (Pixel XL PQ2A.190205.001); gzip",
         }
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://android.googleapis.com/auth",
-                headers=headers,
-                data=auth_request_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://android.googleapis.com/auth",
+            headers=headers,
+            data=auth_request_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -146,13 +156,12 @@ class Api:
             "X-Goog-Hash": f"sha1={sha_hash_b64}",
             "X-Upload-Content-Length": str(file_size),
         }
-        with self._new_session() as session:
-            response = session.post(
-                "https://photos.googleapis.com/data/upload/uploadmedia/interactive",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photos.googleapis.com/data/upload/uploadmedia/interactive",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
         response.raise_for_status()
         return response.headers["X-GUploader-UploadID"]
 
@@ -179,13 +188,12 @@ class Api:
             "User-Agent": self.user_agent,
             "Authorization": f"Bearer {self.bearer_token}",
         }
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/5084965799730810217",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/5084965799730810217",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
         response.raise_for_status()
 
         decoded_message, _ = decode_message(response.content)
@@ -214,22 +222,21 @@ class Api:
             "Authorization": f"Bearer {self.bearer_token}",
         }
 
-        with self._new_session() as session:
-            if isinstance(file, (str, Path)):
-                with Path(file).open("rb") as f:
-                    response = session.put(
-                        f"https://photos.googleapis.com/data/upload/uploadmedia/interactive?upload_id={upload_token}",
-                        headers=headers,
-                        timeout=self.timeout,
-                        data=f,
-                    )
-            else:
-                response = session.put(
+        if isinstance(file, (str, Path)):
+            with Path(file).open("rb") as f:
+                response = self._session.put(
                     f"https://photos.googleapis.com/data/upload/uploadmedia/interactive?upload_id={upload_token}",
                     headers=headers,
                     timeout=self.timeout,
-                    data=file,
+                    data=f,
                 )
+        else:
+            response = self._session.put(
+                f"https://photos.googleapis.com/data/upload/uploadmedia/interactive?upload_id={upload_token}",
+                headers=headers,
+                timeout=self.timeout,
+                data=file,
+            )
 
         response.raise_for_status()
 
@@ -342,13 +349,12 @@ class Api:
             "x-goog-ext-173412678-bin": "CgcIAhClARgC",
             "x-goog-ext-174067345-bin": "CgIIAg==",
         }
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/16538846908252377752",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/16538846908252377752",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
         response.raise_for_status()
         decoded_message, _ = decode_message(response.content)
         try:
@@ -386,13 +392,12 @@ class Api:
             "User-Agent": self.user_agent,
             "Authorization": f"Bearer {self.bearer_token}",
         }
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/17490284929287180316",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/17490284929287180316",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
         response.raise_for_status()
 
         decoded_message, _ = decode_message(response.content)
@@ -433,13 +438,12 @@ class Api:
             "x-goog-ext-173412678-bin": "CgcIAhClARgC",
             "x-goog-ext-174067345-bin": "CgIIAg==",
         }
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/8386163679468898444",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/8386163679468898444",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
         response.raise_for_status()
 
         decoded_message, _ = decode_message(response.content)
@@ -477,13 +481,12 @@ class Api:
             "x-goog-ext-173412678-bin": "CgcIAhClARgC",
             "x-goog-ext-174067345-bin": "CgIIAg==",
         }
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/484917746253879292",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/484917746253879292",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
         response.raise_for_status()
 
         decoded_message, _ = decode_message(response.content)
@@ -655,13 +658,12 @@ class Api:
         }
         serialized_data = encode_message(proto_body, message_types.GET_LIB_STATE)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/18047484249733410717",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/18047484249733410717",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -820,13 +822,12 @@ class Api:
         }
         serialized_data = encode_message(proto_body, message_types.GET_LIB_PAGE_INIT)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/18047484249733410717",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/18047484249733410717",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -989,13 +990,12 @@ class Api:
 
         serialized_data = encode_message(proto_body, message_types.GET_LIB_PAGE)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/18047484249733410717",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/18047484249733410717",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -1024,13 +1024,12 @@ class Api:
 
         serialized_data = encode_message(proto_body, message_types.SET_CAPTION)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/1552790390512470739",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/1552790390512470739",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -1073,12 +1072,11 @@ class Api:
         if no_overlay:
             url += "-no"
 
-        with self._new_session() as session:
-            response = session.get(
-                url,
-                headers=headers,
-                timeout=self.timeout,
-            )
+        response = self._session.get(
+            url,
+            headers=headers,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -1110,13 +1108,12 @@ class Api:
 
         serialized_data = encode_message(proto_body, message_types.SET_FAVORITE)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/5144645502632292153",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/5144645502632292153",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -1152,13 +1149,12 @@ class Api:
 
         serialized_data = encode_message(proto_body, message_types.SET_ARCHIVED)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/6715446385130606868",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/6715446385130606868",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -1192,13 +1188,12 @@ class Api:
 
         serialized_data = encode_message(proto_body, message_types.GET_DOWNLOAD_URLS)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/$rpc/social.frontend.photos.preparedownloaddata.v1.PhotosPrepareDownloadDataService/PhotosPrepareDownload",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/$rpc/social.frontend.photos.preparedownloaddata.v1.PhotosPrepareDownloadDataService/PhotosPrepareDownload",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -1234,13 +1229,12 @@ class Api:
 
         serialized_data = encode_message(proto_body, message_types.RESTORE_FROM_TRASH)  # type: ignore
 
-        with self._new_session() as session:
-            response = session.post(
-                "https://photosdata-pa.googleapis.com/6439526531001121323/17490284929287180316",
-                headers=headers,
-                data=serialized_data,
-                timeout=self.timeout,
-            )
+        response = self._session.post(
+            "https://photosdata-pa.googleapis.com/6439526531001121323/17490284929287180316",
+            headers=headers,
+            data=serialized_data,
+            timeout=self.timeout,
+        )
 
         response.raise_for_status()
 
@@ -34,6 +34,9 @@ signal.signal(signal.SIGINT, signal.SIG_DFL)
 
 LogLevel = Literal["INFO", "DEBUG", "WARNING", "ERROR", "CRITICAL"]
 
+# Dedup keys sent per trash / restore request
+TRASH_BATCH_SIZE = 500
+
 
 class Client:
     """Google Photos client based on reverse engineered mobile API."""
@@ -474,8 +477,7 @@ class Client:
                 for future in as_completed(futures):
                     file = futures[future]
                     try:
-                        media_key_dict = future.result()
-                        uploaded_files = uploaded_files | media_key_dict
+                        uploaded_files.update(future.result())
                     except Exception as e:
                         self.logger.error(f"Error uploading file {file}: {e}")
                         upload_error_count += 1
@@ -484,6 +486,24 @@ class Client:
                         overall_progress.advance(overall_task_id)
         return uploaded_files
 
+    @staticmethod
+    def _hashes_to_dedup_keys(sha1_hashes: str | bytes | Sequence[str | bytes]) -> list[str]:
+        """
+        Convert one or more SHA-1 hashes to dedup keys.
+
+        Raises:
+            ValueError: If input hashes are invalid.
+        """
+        if isinstance(sha1_hashes, (str, bytes)):
+            sha1_hashes = [sha1_hashes]
+
+        try:
+            # Convert all hashes to Base64 format
+            hashes_b64 = [convert_sha1_hash(hash)[1] for hash in sha1_hashes]  # type: ignore
+            return [utils.urlsafe_base64(hash) for hash in hashes_b64]
+        except (TypeError, ValueError) as e:
+            raise ValueError("Invalid SHA-1 hash format") from e
+
     def move_to_trash(self, sha1_hashes: str | bytes | Sequence[str | bytes]) -> dict:
         """
         Move remote media files to trash.
@@ -497,23 +517,35 @@ class Client:
         Raises:
             ValueError: If input hashes are invalid.
         """
+        dedup_keys = self._hashes_to_dedup_keys(sha1_hashes)
 
-        if isinstance(sha1_hashes, (str, bytes)):
-            sha1_hashes = [sha1_hashes]
+        # Process in batches to avoid API limits
+        response = {}
+        for batch in utils.batched(dedup_keys, TRASH_BATCH_SIZE):
+            batch_response = self.api.move_remote_media_to_trash(dedup_keys=batch)
+            response.update(batch_response)  # Combine responses if needed
 
-        try:
-            # Convert all hashes to Base64 format
-            hashes_b64 = [convert_sha1_hash(hash)[1] for hash in sha1_hashes]  # type: ignore
-            dedup_keys = [utils.urlsafe_base64(hash) for hash in hashes_b64]
-        except (TypeError, ValueError) as e:
-            raise ValueError("Invalid SHA-1 hash format") from e
+        return response
 
-        # Process in batches of 500 to avoid API limits
-        batch_size = 500
+    def restore_from_trash(self, sha1_hashes: str | bytes | Sequence[str | bytes]) -> dict:
+        """
+        Restore remote media files from trash.
+
+        Args:
+            sha1_hashes: Single SHA-1 hash or sequence of hashes to restore from trash.
+
+        Returns:
+            dict: API response containing operation results.
+
+        Raises:
+            ValueError: If input hashes are invalid.
+        """
+        dedup_keys = self._hashes_to_dedup_keys(sha1_hashes)
+
+        # Process in batches to avoid API limits
         response = {}
-        for i in range(0, len(dedup_keys), batch_size):
-            batch = dedup_keys[i : i + batch_size]
-            batch_response = self.api.move_remote_media_to_trash(dedup_keys=batch)
+        for batch in utils.batched(dedup_keys, TRASH_BATCH_SIZE):
+            batch_response = self.api.restore_from_trash(dedup_keys=batch)
             response.update(batch_response)  # Combine responses if needed
 
         return response
@@ -631,6 +663,7 @@ class Client:
                 self._cache_init(progress, task_id)
                 with Storage(self.db_path) as storage:
                     storage.set_init_state(1)
+                    storage.analyze()
             self.logger.info("Cache Update")
             self._cache_update(progress, task_id)
 
@@ -638,19 +671,21 @@ class Client:
         with Storage(self.db_path) as storage:
             state_token, _ = storage.get_state_tokens()
         response = self.api.get_library_state(state_token)
-        next_state_token, next_page_token, remote_media, collections, media_keys_to_delete, collection_keys_to_delete = parse_db_update(response)
+        update = parse_db_update(response)
+        next_page_token = update.next_page_token
+        media_keys_to_delete, collection_keys_to_delete = update.deletions()
 
         with Storage(self.db_path) as storage:
-            storage.update_state_tokens(next_state_token, next_page_token)
-            storage.update(remote_media)
-            storage.update_collections(collections)
+            storage.update_state_tokens(update.state_token, next_page_token)
+            updated_count = storage.update(update.media_iter())
+            storage.update_collections(update.collection_iter())
             storage.delete(media_keys_to_delete)
             storage.delete_collections(collection_keys_to_delete)
 
         task = progress.tasks[int(task_id)]
         progress.update(
             task_id,
-            updated=task.fields["updated"] + len(remote_media),
+            updated=task.fields["updated"] + updated_count,
             media_deleted=task.fields["media_deleted"] + len(media_keys_to_delete),
             collection_deleted=task.fields["collection_deleted"] + len(collection_keys_to_delete),
         )
@@ -666,17 +701,18 @@ class Client:
             self._process_pages_init(progress, task_id, next_page_token)
 
         response = self.api.get_library_state(state_token)
-        state_token, next_page_token, remote_media, collections, _, _ = parse_db_update(response)
+        update = parse_db_update(response)
+        next_page_token = update.next_page_token
 
         with Storage(self.db_path) as storage:
-            storage.update_state_tokens(state_token, next_page_token)
-            storage.update(remote_media)
-            storage.update_collections(collections)
+            storage.update_state_tokens(update.state_token, next_page_token)
+            updated_count = storage.update(update.media_iter())
+            storage.update_collections(update.collection_iter())
 
         task = progress.tasks[int(task_id)]
         progress.update(
             task_id,
-            updated=task.fields["updated"] + len(remote_media),
+            updated=task.fields["updated"] + updated_count,
         )
 
         if next_page_token:
@@ -694,19 +730,21 @@ class Client:
         next_page_token: str | None = page_token
         while True:
             response = self.api.get_library_page_init(next_page_token)
-            _, next_page_token, remote_media, collections, media_keys_to_delete, collection_keys_to_delete = parse_db_update(response)
+            update = parse_db_update(response)
+            next_page_token = update.next_page_token
+            media_keys_to_delete, collection_keys_to_delete = update.deletions()
 
             with Storage(self.db_path) as storage:
                 storage.update_state_tokens(page_token=next_page_token)
-                storage.update(remote_media)
-                storage.update_collections(collections)
+                updated_count = storage.update(update.media_iter())
+                storage.update_collections(update.collection_iter())
                 storage.delete(media_keys_to_delete)
                 storage.delete_collections(collection_keys_to_delete)
 
             task = progress.tasks[int(task_id)]
             progress.update(
                 task_id,
-                updated=task.fields["updated"] + len(remote_media),
+                updated=task.fields["updated"] + updated_count,
                 media_deleted=task.fields["media_deleted"] + len(media_keys_to_delete),
                 collection_deleted=task.fields["collection_deleted"] + len(collection_keys_to_delete),
             )
@@ -725,19 +763,21 @@ class Client:
         next_page_token: str | None = page_token
         while True:
             response = self.api.get_library_page(next_page_token, state_token)
-            _, next_page_token, remote_media, collections, media_keys_to_delete, collection_keys_to_delete = parse_db_update(response)
+            update = parse_db_update(response)
+            next_page_token = update.next_page_token
+            media_keys_to_delete, collection_keys_to_delete = update.deletions()
 
             with Storage(self.db_path) as storage:
                 storage.update_state_tokens(page_token=next_page_token)
-                storage.update(remote_media)
-                storage.update_collections(collections)
+                updated_count = storage.update(update.media_iter())
+                storage.update_collections(update.collection_iter())
                 storage.delete(media_keys_to_delete)
                 storage.delete_collections(collection_keys_to_delete)
 
             task = progress.tasks[int(task_id)]
             progress.update(
                 task_id,
-                updated=task.fields["updated"] + len(remote_media),
+                updated=task.fields["updated"] + updated_count,
                 media_deleted=task.fields["media_deleted"] + len(media_keys_to_delete),
                 collection_deleted=task.fields["collection_deleted"] + len(collection_keys_to_delete),
             )
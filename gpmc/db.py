@@ -1,153 +1,324 @@
 import sqlite3
-from typing import Iterable, Self, Sequence
-from dataclasses import asdict
+import threading
+from contextlib import contextmanager
+from operator import attrgetter
+from typing import Iterable, Iterator, Self, Sequence
+from dataclasses import fields
 from pathlib import Path
 
 from .models import MediaItem, CollectionItem
+from .utils import batched
+
+# Rows per executemany call when upserting
+BATCH_SIZE = 10000
+
+# Bump when the schema changes, older databases are brought up to date on open
+SCHEMA_VERSION = 1
+
+_SCHEMA_SQL = f"""
+-- Only takes effect on a new database, keeps large upserts from reshuffling pages on commit
+PRAGMA auto_vacuum = NONE;
+
+BEGIN IMMEDIATE;
+
+CREATE TABLE IF NOT EXISTS remote_media (
+    media_key TEXT PRIMARY KEY,
+    file_name TEXT,
+    dedup_key TEXT,
+    is_canonical BOOL,
+    type INTEGER,
+    caption TEXT,
+    collection_id TEXT,
+    size_bytes INTEGER,
+    quota_charged_bytes INTEGER,
+    origin TEXT,
+    content_version INTEGER,
+    utc_timestamp INTEGER,
+    server_creation_timestamp INTEGER,
+    timezone_offset INTEGER,
+    width INTEGER,
+    height INTEGER,
+    remote_url TEXT,
+    upload_status INTEGER,
+    trash_timestamp INTEGER,
+    is_archived INTEGER,
+    is_favorite INTEGER,
+    is_locked INTEGER,
+    is_original_quality INTEGER,
+    latitude REAL,
+    longitude REAL,
+    location_name TEXT,
+    location_id TEXT,
+    is_edited INTEGER,
+    make TEXT,
+    model TEXT,
+    aperture REAL,
+    shutter_speed REAL,
+    iso INTEGER,
+    focal_length REAL,
+    duration INTEGER,
+    capture_frame_rate REAL,
+    encoded_frame_rate REAL,
+    is_micro_video INTEGER,
+    micro_video_width INTEGER,
+    micro_video_height INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS collections (
+    collection_media_key TEXT PRIMARY KEY,
+    collection_album_id TEXT,
+    title TEXT,
+    total_items INTEGER,
+    type INTEGER,
+    sort_order INTEGER,
+    is_custom_ordered INTEGER,
+    cover_item_media_key TEXT,
+    start INTEGER,
+    end INTEGER,
+    last_activity_time_ms INTEGER
+);
+
+-- Lookups by title pick the most recent album, listings are ordered by activity time,
+-- and collection deletions may also match on the album id
+CREATE INDEX IF NOT EXISTS ix_collections_title_time ON collections(title, last_activity_time_ms DESC);
+CREATE INDEX IF NOT EXISTS ix_collections_time ON collections(last_activity_time_ms DESC);
+CREATE INDEX IF NOT EXISTS ix_collections_album_id ON collections(collection_album_id);
+
+CREATE TABLE IF NOT EXISTS state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    state_token TEXT,
+    page_token TEXT,
+    init_complete INTEGER
+);
+
+INSERT OR IGNORE INTO state (id, state_token, page_token, init_complete)
+VALUES (1, '', '', 0);
+
+PRAGMA user_version = {SCHEMA_VERSION};
+COMMIT;
+"""
+
+
+def _build_upsert_sql(table: str, columns: Sequence[str], conflict_column: str) -> str:
+    """
+    Build an INSERT ... ON CONFLICT DO UPDATE statement for the given columns.
+
+    Conflicting rows are only rewritten when at least one column differs, so re-syncing
+    unchanged items doesn't dirty pages or grow the WAL.
+    """
+    placeholders = ", ".join("?" * len(columns))
+    columns_str = ", ".join(columns)
+    update_columns = [col for col in columns if col != conflict_column]
+    updates = ", ".join(f"{col}=excluded.{col}" for col in update_columns)
+    # Row value IS NOT compares NULLs as equal
+    current = ", ".join(f"{table}.{col}" for col in update_columns)
+    incoming = ", ".join(f"excluded.{col}" for col in update_columns)
+    return f"""
+    INSERT INTO {table} ({columns_str})
+    VALUES ({placeholders})
+    ON CONFLICT({conflict_column}) DO UPDATE SET {updates}
+    WHERE ({current}) IS NOT ({incoming})
+    """
+
+
+# Column order follows the dataclass field order, so rows can be pulled with a single attrgetter call
+_MEDIA_FIELDS = tuple(f.name for f in fields(MediaItem))
+_MEDIA_GETTER = attrgetter(*_MEDIA_FIELDS)
+_UPSERT_MEDIA_SQL = _build_upsert_sql("remote_media", _MEDIA_FIELDS, "media_key")
+
+_COLLECTION_FIELDS = tuple(f.name for f in fields(CollectionItem))
+_COLLECTION_GETTER = attrgetter(*_COLLECTION_FIELDS)
+_UPSERT_COLLECTIONS_SQL = _build_upsert_sql("collections", _COLLECTION_FIELDS, "collection_media_key")
+_SELECT_COLLECTIONS_SQL = f"SELECT {', '.join(_COLLECTION_FIELDS)} FROM collections"
+# Constant statement texts, so every call hits the connection's prepared statement cache.
+# A negative LIMIT means no limit, which keeps get_collections to a single statement.
+_GET_COLLECTIONS_SQL = f"{_SELECT_COLLECTIONS_SQL} ORDER BY last_activity_time_ms DESC LIMIT ?"
+_GET_COLLECTION_BY_ID_SQL = f"{_SELECT_COLLECTIONS_SQL} WHERE collection_media_key = ?"
+_GET_COLLECTION_BY_TITLE_SQL = f"{_SELECT_COLLECTIONS_SQL} WHERE title = ? ORDER BY last_activity_time_ms DESC LIMIT 1"
+
+
+def _collection_from_row(row: Sequence) -> CollectionItem:
+    """Build a CollectionItem from a row selected in `_COLLECTION_FIELDS` order."""
+    item = CollectionItem(*row)
+    # Convert integer boolean fields back to boolean
+    item.is_custom_ordered = bool(item.is_custom_ordered)
+    return item
+
+
+class _Connection(sqlite3.Connection):
+    """Connection that also holds state cached by the Storages sharing it."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        # state.init_complete, None until first read
+        self.init_state: int | None = None
+        # Open Storages using the connection, it is closed when the last one closes
+        self.refcount = 0
+
+
+def _close_connection(conn: sqlite3.Connection) -> None:
+    """Refresh planner statistics if needed and close the connection."""
+    try:
+        # Usually a no-op, only re-analyzes tables whose statistics went stale
+        conn.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        # Best effort, e.g. the database may be locked by another writer
+        pass
+    conn.close()
+
+
+class _ThreadConnections(threading.local):
+    """Connections to database files in use by open Storages, per thread and resolved path."""
+
+    def __init__(self) -> None:
+        self.connections: dict[str, _Connection] = {}
+
+
+_thread_connections = _ThreadConnections()
 
 
 class Storage:
     def __init__(self, db_path: str | Path) -> None:
-        self.conn = sqlite3.connect(db_path)
+        self._closed = False
+        # In-memory databases only exist within their connection, so they are never shared
+        if db_path in ("", ":memory:"):
+            self._key = None
+        else:
+            self._key = str(Path(db_path).resolve())
+            if (conn := _thread_connections.connections.get(self._key)) is not None:
+                # Nested in a Storage that is still open on the same file in this thread
+                self.conn = conn
+                self.conn.refcount += 1
+                # Re-read the init state, another thread or process may have changed it meanwhile
+                self.conn.init_state = None
+                return
+
+        # Autocommit mode, transactions are managed explicitly via `_transaction`
+        self.conn = sqlite3.connect(db_path, isolation_level=None, factory=_Connection)
+        self._configure_connection()
         self._create_tables()
+        self.conn.refcount = 1
+        if self._key is not None:
+            _thread_connections.connections[self._key] = self.conn
+
+    @classmethod
+    def open_readonly(cls, db_path: str | Path) -> Self:
+        """
+        Open an existing database for reading only.
+
+        Skips schema setup and never takes the write lock, so it can be used alongside
+        a client that is updating the same cache.
+
+        Args:
+            db_path: Path to an existing database file.
+
+        Raises:
+            sqlite3.OperationalError: If the database file does not exist.
+        """
+        self = cls.__new__(cls)
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        self.conn = sqlite3.connect(uri, uri=True, isolation_level=None, factory=_Connection)
+        self.conn.refcount = 1
+        self._key = None
+        self._closed = False
+        self.conn.execute("PRAGMA query_only=1")
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        self.conn.execute("PRAGMA busy_timeout=5000")
+        return self
 
     def __enter__(self) -> Self:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
-        self.conn.close()
+        self.close()
+
+    def _configure_connection(self) -> None:
+        """Apply connection-level PRAGMAs for faster commits and non-blocking readers."""
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA cache_size=-65536")  # 64 MiB
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+        self.conn.execute("PRAGMA busy_timeout=5000")
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Run the enclosed statements in a single write transaction."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
 
     def _create_tables(self) -> None:
-        """Create the remote_media and collections tables if they don't exist."""
-        self.conn.execute("""
-        CREATE TABLE IF NOT EXISTS remote_media (
-            media_key TEXT PRIMARY KEY,
-            file_name TEXT,
-            dedup_key TEXT,
-            is_canonical BOOL,
-            type INTEGER,
-            caption TEXT,
-            collection_id TEXT,
-            size_bytes INTEGER,
-            quota_charged_bytes INTEGER,
-            origin TEXT,
-            content_version INTEGER,
-            utc_timestamp INTEGER,
-            server_creation_timestamp INTEGER,
-            timezone_offset INTEGER,
-            width INTEGER,
-            height INTEGER,
-            remote_url TEXT,
-            upload_status INTEGER,
-            trash_timestamp INTEGER,
-            is_archived INTEGER,
-            is_favorite INTEGER,
-            is_locked INTEGER,
-            is_original_quality INTEGER,
-            latitude REAL,
-            longitude REAL,
-            location_name TEXT,
-            location_id TEXT,
-            is_edited INTEGER,
-            make TEXT,
-            model TEXT,
-            aperture REAL,
-            shutter_speed REAL,
-            iso INTEGER,
-            focal_length REAL,
-            duration INTEGER,
-            capture_frame_rate REAL,
-            encoded_frame_rate REAL,
-            is_micro_video INTEGER,
-            micro_video_width INTEGER,
-            micro_video_height INTEGER
-        )
-        """)
-
-        self.conn.execute("""
-        CREATE TABLE IF NOT EXISTS collections (
-            collection_media_key TEXT PRIMARY KEY,
-            collection_album_id TEXT,
-            title TEXT,
-            total_items INTEGER,
-            type INTEGER,
-            sort_order INTEGER,
-            is_custom_ordered INTEGER,
-            cover_item_media_key TEXT,
-            start INTEGER,
-            end INTEGER,
-            last_activity_time_ms INTEGER
-        )
-        """)
-
-        self.conn.execute("""
-        CREATE TABLE IF NOT EXISTS state (
-            id INTEGER PRIMARY KEY CHECK (id = 1),
-            state_token TEXT,
-            page_token TEXT,
-            init_complete INTEGER
-        )
-        """)
+        """Create the tables and indexes unless the database already has the current schema."""
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        if version >= SCHEMA_VERSION:
+            return
+        try:
+            self.conn.executescript(_SCHEMA_SQL)
+        except sqlite3.Error:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            raise
+
+    def _upsert(self, sql: str, rows: Iterable[tuple], batch_size: int) -> int:
+        """Execute `sql` for every row, in `batch_size` executemany calls, all within one transaction."""
+        count = 0
+        with self._transaction():
+            for batch in batched(rows, batch_size):
+                self.conn.executemany(sql, batch)
+                count += len(batch)
+        return count
+
+    def update(self, items: Iterable[MediaItem], batch_size: int = BATCH_SIZE) -> int:
+        """
+        Insert or update multiple MediaItems in the database.
 
-        self.conn.execute("""
-        INSERT OR IGNORE INTO state (id, state_token, page_token, init_complete)
-        VALUES (1, '', '', 0)
-        """)
-        self.conn.commit()
+        Args:
+            items: Any iterable of MediaItems, consumed in slices of `batch_size` rows,
+                so generators are written without being materialized.
+            batch_size: Number of rows passed to each executemany call.
 
-    def update(self, items: Iterable[MediaItem]) -> None:
-        """Insert or update multiple MediaItems in the database."""
+        Returns:
+            int: Number of items written.
+        """
         if not items:
-            return
-
-        # Convert dataclass objects to dictionaries
-        items_dicts = [asdict(item) for item in items]
+            return 0
 
-        # Prepare the SQL statement with all fields
-        columns = items_dicts[0].keys()
-        placeholders = ", ".join("?" * len(columns))
-        columns_str = ", ".join(columns)
-        updates = ", ".join(f"{col}=excluded.{col}" for col in columns if col != "media_key")
+        return self._upsert(_UPSERT_MEDIA_SQL, map(_MEDIA_GETTER, items), batch_size)
 
-        sql = f"""
-        INSERT INTO remote_media ({columns_str})
-        VALUES ({placeholders})
-        ON CONFLICT(media_key) DO UPDATE SET {updates}
+    def update_collections(self, items: Iterable[CollectionItem], batch_size: int = BATCH_SIZE) -> int:
         """
+        Insert or update multiple CollectionItems in the database.
 
-        # Prepare the values for each item
-        values = [tuple(item[col] for col in columns) for item in items_dicts]
-
-        # Execute in a transaction
-        with self.conn:
-            self.conn.executemany(sql, values)
+        Args:
+            items: Any iterable of CollectionItems, consumed in slices of `batch_size` rows,
+                so generators are written without being materialized.
+            batch_size: Number of rows passed to each executemany call.
 
-    def update_collections(self, items: Iterable[CollectionItem]) -> None:
-        """Insert or update multiple CollectionItems in the database."""
+        Returns:
+            int: Number of items written.
+        """
         if not items:
-            return
+            return 0
 
-        # Convert dataclass objects to dictionaries
-        items_dicts = [asdict(item) for item in items]
+        return self._upsert(_UPSERT_COLLECTIONS_SQL, map(_COLLECTION_GETTER, items), batch_size)
 
-        # Prepare the SQL statement with all fields
-        columns = items_dicts[0].keys()
-        placeholders = ", ".join("?" * len(columns))
-        columns_str = ", ".join(columns)
-        updates = ", ".join(f"{col}=excluded.{col}" for col in columns if col != "collection_media_key")
-
-        sql = f"""
-        INSERT INTO collections ({columns_str})
-        VALUES ({placeholders})
-        ON CONFLICT(collection_media_key) DO UPDATE SET {updates}
+    def _stage_keys(self, keys: Iterable[str]) -> None:
         """
+        Load keys into the `_del` temp table, replacing its previous contents.
 
-        # Prepare the values for each item
-        values = [tuple(item[col] for col in columns) for item in items_dicts]
-
-        # Execute in a transaction
-        with self.conn:
-            self.conn.executemany(sql, values)
+        Deleting via `IN (SELECT k FROM _del)` keeps the statement text constant and
+        avoids SQLite's bound-parameter limit, regardless of how many keys are passed.
+        Must be called inside a transaction.
+        """
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS _del (k TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.conn.execute("DELETE FROM _del")
+        self.conn.executemany("INSERT OR IGNORE INTO _del VALUES (?)", ((key,) for key in keys))
 
     def delete(self, media_keys: Sequence[str]) -> None:
         """
@@ -159,15 +330,10 @@ class Storage:
         if not media_keys:
             return
 
-        # Create a temporary table with the keys to delete
-        sql = """
-        DELETE FROM remote_media
-        WHERE media_key IN ({})
-        """.format(",".join(["?"] * len(media_keys)))
-
         # Execute in a transaction
-        with self.conn:
-            self.conn.execute(sql, media_keys)
+        with self._transaction():
+            self._stage_keys(media_keys)
+            self.conn.execute("DELETE FROM remote_media WHERE media_key IN (SELECT k FROM _del)")
 
     def delete_collections(self, collection_keys: Sequence[str]) -> None:
         """
@@ -179,15 +345,30 @@ class Storage:
         if not collection_keys:
             return
 
-        sql = """
-        DELETE FROM collections
-        WHERE collection_media_key IN ({placeholders})
-           OR collection_album_id IN ({placeholders})
-        """.format(placeholders=",".join(["?"] * len(collection_keys)))
+        # Execute in a transaction - the staged keys are matched against both key columns
+        with self._transaction():
+            self._stage_keys(collection_keys)
+            # A single statement, SQLite serves each side of the OR from its own index
+            self.conn.execute(
+                "DELETE FROM collections "
+                "WHERE collection_media_key IN (SELECT k FROM _del) OR collection_album_id IN (SELECT k FROM _del)"
+            )
+
+    def iter_collections(self, limit: int | None = None) -> Iterator[CollectionItem]:
+        """
+        Lazily yield collections (albums) from the database, most recently active first.
+
+        Rows are fetched and converted as the iterator is consumed.
+
+        Args:
+            limit: Optional limit on the number of collections to retrieve.
+                  If None, retrieves all collections.
 
-        # Execute in a transaction - duplicate the keys list for both IN clauses
-        with self.conn:
-            self.conn.execute(sql, collection_keys + collection_keys)
+        Yields:
+            CollectionItem: The next collection.
+        """
+        for row in self.conn.execute(_GET_COLLECTIONS_SQL, (limit or -1,)):
+            yield _collection_from_row(row)
 
     def get_collections(self, limit: int | None = None) -> list[CollectionItem]:
         """
@@ -200,21 +381,11 @@ class Storage:
         Returns:
             list[CollectionItem]: List of CollectionItem objects from the database.
         """
-        sql = "SELECT * FROM collections ORDER BY last_activity_time_ms DESC"
-        if limit:
-            sql += f" LIMIT {limit}"
-
-        cursor = self.conn.execute(sql)
-        columns = [description[0] for description in cursor.description]
-        
-        collections = []
-        for row in cursor.fetchall():
-            row_dict = dict(zip(columns, row))
-            # Convert integer boolean fields back to boolean
-            row_dict['is_custom_ordered'] = bool(row_dict['is_custom_ordered'])
-            collections.append(CollectionItem(**row_dict))
-        
-        return collections
+        return list(self.iter_collections(limit))
+
+    def collection_count(self) -> int:
+        """Return the number of collections in the database."""
+        return self.conn.execute("SELECT COUNT(*) FROM collections").fetchone()[0]
 
     def get_collection_by_id(self, collection_media_key: str) -> CollectionItem | None:
         """
@@ -226,20 +397,8 @@ class Storage:
         Returns:
             CollectionItem | None: The collection if found, otherwise None.
         """
-        cursor = self.conn.execute(
-            "SELECT * FROM collections WHERE collection_media_key = ?",
-            (collection_media_key,)
-        )
-        columns = [description[0] for description in cursor.description]
-        row = cursor.fetchone()
-        
-        if row:
-            row_dict = dict(zip(columns, row))
-            # Convert integer boolean fields back to boolean
-            row_dict['is_custom_ordered'] = bool(row_dict['is_custom_ordered'])
-            return CollectionItem(**row_dict)
-        
-        return None
+        row = self.conn.execute(_GET_COLLECTION_BY_ID_SQL, (collection_media_key,)).fetchone()
+        return _collection_from_row(row) if row else None
 
     def get_collection_by_title(self, title: str) -> CollectionItem | None:
         """
@@ -251,20 +410,8 @@ class Storage:
         Returns:
             CollectionItem | None: The collection if found, otherwise None.
         """
-        cursor = self.conn.execute(
-            "SELECT * FROM collections WHERE title = ? ORDER BY last_activity_time_ms DESC LIMIT 1",
-            (title,)
-        )
-        columns = [description[0] for description in cursor.description]
-        row = cursor.fetchone()
-        
-        if row:
-            row_dict = dict(zip(columns, row))
-            # Convert integer boolean fields back to boolean
-            row_dict['is_custom_ordered'] = bool(row_dict['is_custom_ordered'])
-            return CollectionItem(**row_dict)
-        
-        return None
+        row = self.conn.execute(_GET_COLLECTION_BY_TITLE_SQL, (title,)).fetchone()
+        return _collection_from_row(row) if row else None
 
     def get_state_tokens(self) -> tuple[str, str]:
         """
@@ -293,21 +440,61 @@ class Storage:
 
         if updates:
             sql = f"UPDATE state SET {', '.join(updates)} WHERE id = 1"
-            with self.conn:
+            with self._transaction():
                 self.conn.execute(sql, params)
 
     def get_init_state(self) -> bool:
-        """ """
-        cursor = self.conn.execute("""
-        SELECT init_complete FROM state WHERE id = 1
-        """)
-        return cursor.fetchone()[0] or False
+        """Return whether the initial cache load completed, read once per Storage and shared with nested ones."""
+        if self.conn.init_state is None:
+            cursor = self.conn.execute("""
+            SELECT init_complete FROM state WHERE id = 1
+            """)
+            self.conn.init_state = cursor.fetchone()[0]
+        return self.conn.init_state or False
 
     def set_init_state(self, state: int) -> None:
         """ """
-        with self.conn:
-            self.conn.execute(f"UPDATE state SET init_complete = {state} WHERE id = 1")
+        with self._transaction():
+            self.conn.execute("UPDATE state SET init_complete = ? WHERE id = 1", (state,))
+        self.conn.init_state = state
+
+    def reset(self) -> None:
+        """Remove all cached media items and collections and reset the sync state."""
+        with self._transaction():
+            self.conn.execute("DELETE FROM remote_media")
+            self.conn.execute("DELETE FROM collections")
+            self.conn.execute("UPDATE state SET state_token = '', page_token = '', init_complete = 0 WHERE id = 1")
+        self.conn.init_state = 0
+
+    def analyze(self) -> None:
+        """Refresh query planner statistics, e.g. after the initial bulk load of the cache."""
+        self.conn.execute("ANALYZE")
+
+    def vacuum(self) -> None:
+        """Rebuild the database file to reclaim free pages, for manual maintenance."""
+        self.conn.execute("VACUUM")
 
     def close(self) -> None:
-        """Close the database connection."""
-        self.conn.close()
+        """
+        Release the database connection.
+
+        A connection shared by nested Storages on the same file is closed when the
+        outermost one closes.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.conn.refcount -= 1
+        if self.conn.refcount == 0:
+            connections = _thread_connections.connections
+            if self._key is not None and connections.get(self._key) is self.conn:
+                del connections[self._key]
+            _close_connection(self.conn)
+
+    @staticmethod
+    def close_all() -> None:
+        """Close the connections still open in the calling thread, e.g. by Storages that were never closed."""
+        connections = _thread_connections.connections
+        while connections:
+            _, conn = connections.popitem()
+            _close_connection(conn)
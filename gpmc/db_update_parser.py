@@ -1,85 +1,121 @@
-import base64
+import logging
+from base64 import urlsafe_b64encode
+from dataclasses import dataclass
+from typing import Iterator
 
 from .models import MediaItem, CollectionItem
-from .utils import int64_to_float, int32_to_float, fixed32_to_float, urlsafe_base64
+from .utils import int64_to_float, int32_to_float, fixed32_to_float
+
+_log = logging.getLogger(__name__)
+
+# Raw items come straight from blackboxprotobuf.decode_message, keyed by field number strings.
+# They are walked as-is: str hashes are cached, so lookups cost the same as with int keys,
+# while re-keying a decoded response would cost several times the parse itself.
+
+# blackboxprotobuf stores a field decoded with an alternate type under "<field>-<n>",
+# so these fields can appear under any of the listed keys
+_DEDUP_KEY_FIELDS = ("1", "1-1", "1-2", "1-3")
+_CAPTION_FIELDS = ("3", "3-1", "3-2", "3-3")
+
+# Location of the deleted item's key inside d["1"], by deletion type
+_DELETION_PATHS = {
+    1: ("2", "1"),  # media item deletion
+    2: ("3", "1"),  # collection deletion (uses collection_media_key)
+    4: ("5", "2"),  # collection deletion (variant 1)
+    6: ("7", "1"),  # collection deletion (variant 2)
+}
+
+_ORIGIN_MAP = {
+    1: "self",
+    3: "partner",
+    4: "shared",
+}
+
+
+def _get_field(d: dict, keys: tuple[str, ...], default=None):
+    """Return the value of the first of `keys` present in `d`."""
+    for key in keys:
+        if key in d:
+            return d[key]
+    return default
 
 
 def _parse_media_item(d: dict) -> MediaItem:
     """Parse a single media item from the raw data."""
 
-    dedup_key = next((d["2"]["21"][key] for key in d["2"]["21"] if key.startswith("1")), "")
+    info = d["2"]
+    dedup_key = _get_field(info["21"], _DEDUP_KEY_FIELDS, "")
     if not isinstance(dedup_key, str):
         try:
-            dedup_key = urlsafe_base64(base64.b64encode(d["2"]["13"]["1"]).decode())
+            # URL-safe Base64 of the SHA-1 hash without padding, same as utils.urlsafe_base64
+            dedup_key = urlsafe_b64encode(info["13"]["1"]).rstrip(b"=").decode("ascii")
         except Exception as e:
             raise RuntimeError("Error parsing dedup_key") from e
 
-    origin_map = {
-        1: "self",
-        3: "partner",
-        4: "shared",
-    }
-
     item = MediaItem(
         media_key=d["1"],
-        caption=next((d["2"][key] for key in d["2"] if key.startswith("3")), "") or None,
-        file_name=d["2"]["4"],
+        caption=_get_field(info, _CAPTION_FIELDS) or None,
+        file_name=info["4"],
         dedup_key=dedup_key,
-        is_canonical=not any(prop.get("1") == 27 for prop in d["2"]["5"]),
+        is_canonical=27 not in {prop.get("1") for prop in info["5"]},
         type=d["5"]["1"],
-        collection_id=d["2"]["1"]["1"],
-        size_bytes=d["2"]["10"],
-        timezone_offset=d["2"].get("8", 0),
-        utc_timestamp=d["2"]["7"],
-        server_creation_timestamp=d["2"]["9"],
-        upload_status=d["2"]["11"],
-        quota_charged_bytes=d["2"]["35"]["2"],
-        origin=origin_map[d["2"]["30"]["1"]],
-        content_version=d["2"]["26"],
-        trash_timestamp=d["2"]["16"].get("3", 0),
-        is_archived=d["2"]["29"]["1"] == 1,
-        is_favorite=d["2"]["31"]["1"] == 1,
-        is_locked=d["2"]["39"]["1"] == 1,
-        is_original_quality=d["2"]["35"]["3"] == 2,
+        collection_id=info["1"]["1"],
+        size_bytes=info["10"],
+        timezone_offset=info.get("8", 0),
+        utc_timestamp=info["7"],
+        server_creation_timestamp=info["9"],
+        upload_status=info["11"],
+        quota_charged_bytes=info["35"]["2"],
+        origin=_ORIGIN_MAP[info["30"]["1"]],
+        content_version=info["26"],
+        trash_timestamp=info["16"].get("3", 0),
+        is_archived=info["29"]["1"] == 1,
+        is_favorite=info["31"]["1"] == 1,
+        is_locked=info["39"]["1"] == 1,
+        is_original_quality=info["35"]["3"] == 2,
     )
 
-    if d["17"].get("1"):
-        item.latitude = fixed32_to_float(d["17"]["1"]["1"])
-        item.longitude = fixed32_to_float(d["17"]["1"]["2"])
-    if d["17"].get("5"):
-        item.location_name = d["17"]["5"]["2"]["1"]
-        item.location_id = d["17"]["5"]["3"]
+    location = d["17"]
+    if coordinates := location.get("1"):
+        item.latitude = fixed32_to_float(coordinates["1"])
+        item.longitude = fixed32_to_float(coordinates["2"])
+    if place := location.get("5"):
+        item.location_name = place["2"]["1"]
+        item.location_id = place["3"]
 
-    if d["5"].get("2"):
+    media = d["5"]
+    if photo := media.get("2"):
         # photo
-        item.is_edited = "4" in d["5"]["2"]
-        item.remote_url = d["5"]["2"]["1"]["1"]
-        item.width = d["5"]["2"]["1"]["9"]["1"]
-        item.height = d["5"]["2"]["1"]["9"]["2"]
-        if d["5"]["2"]["1"]["9"].get("5"):
-            item.make = d["5"]["2"]["1"]["9"]["5"].get("1")
-            item.model = d["5"]["2"]["1"]["9"]["5"].get("2")
-            item.aperture = d["5"]["2"]["1"]["9"]["5"].get("4") and int32_to_float(d["5"]["2"]["1"]["9"]["5"]["4"])
-            item.shutter_speed = d["5"]["2"]["1"]["9"]["5"].get("5") and int32_to_float(d["5"]["2"]["1"]["9"]["5"]["5"])
-            item.iso = d["5"]["2"]["1"]["9"]["5"].get("6")
-            item.focal_length = d["5"]["2"]["1"]["9"]["5"].get("7") and int32_to_float(d["5"]["2"]["1"]["9"]["5"]["7"])
-
-    if d["5"].get("3"):
+        item.is_edited = "4" in photo
+        item.remote_url = photo["1"]["1"]
+        photo_info = photo["1"]["9"]
+        item.width = photo_info["1"]
+        item.height = photo_info["2"]
+        if exif := photo_info.get("5"):
+            item.make = exif.get("1")
+            item.model = exif.get("2")
+            item.aperture = (v := exif.get("4")) and int32_to_float(v)
+            item.shutter_speed = (v := exif.get("5")) and int32_to_float(v)
+            item.iso = exif.get("6")
+            item.focal_length = (v := exif.get("7")) and int32_to_float(v)
+
+    if video := media.get("3"):
         # video
-        item.remote_url = d["5"]["3"]["2"]["1"]
-        if d["5"]["3"].get("4"):
-            item.duration = d["5"]["3"]["4"].get("1")
-            item.width = d["5"]["3"]["4"].get("4")
-            item.height = d["5"]["3"]["4"].get("5")
-        item.capture_frame_rate = d["5"]["3"].get("6", {}).get("4") and int64_to_float(d["5"]["3"]["6"]["4"])
-        item.encoded_frame_rate = d["5"]["3"].get("6", {}).get("5") and int64_to_float(d["5"]["3"]["6"]["5"])
-
-    if d["5"].get("5", {}).get("2", {}).get("4"):
+        item.remote_url = video["2"]["1"]
+        if video_info := video.get("4"):
+            item.duration = video_info.get("1")
+            item.width = video_info.get("4")
+            item.height = video_info.get("5")
+        frame_rates = video.get("6", {})
+        item.capture_frame_rate = (v := frame_rates.get("4")) and int64_to_float(v)
+        item.encoded_frame_rate = (v := frame_rates.get("5")) and int64_to_float(v)
+
+    if micro_video := media.get("5", {}).get("2", {}).get("4"):
         # micro video
         item.is_micro_video = True
-        item.duration = d["5"]["5"]["2"]["4"]["1"]
-        item.micro_video_width = d["5"]["5"]["2"]["4"]["4"]
-        item.micro_video_height = d["5"]["5"]["2"]["4"]["5"]
+        item.duration = micro_video["1"]
+        item.micro_video_width = micro_video["4"]
+        item.micro_video_height = micro_video["5"]
 
     return item
 
@@ -95,37 +131,25 @@ def _parse_deletion_item(d: dict) -> tuple[int, str | None]:
             - type 4: collection deletion (variant 1)
             - type 6: collection deletion (variant 2)
     """
-    import logging
-    
     try:
-        deletion_type = d["1"]["1"]
-        
-        if deletion_type == 1:
-            # Type 1 - media item deletion
-            if "2" in d["1"] and "1" in d["1"]["2"]:
-                return (1, d["1"]["2"]["1"])
-            else:
-                logging.warning(f"Type 1 deletion with unexpected structure")
-        elif deletion_type == 2:
-            # Type 2 - collection deletion (uses collection_media_key)
-            if "3" in d["1"] and "1" in d["1"]["3"]:
-                return (2, d["1"]["3"]["1"])
-            logging.warning(f"Type 2 deletion with unexpected structure")
-        elif deletion_type == 4:
-            # Collection deletion (type 4)
-            if "5" in d["1"] and "2" in d["1"]["5"]:
-                return (4, d["1"]["5"]["2"])
-            logging.warning(f"Type 4 deletion with unexpected structure")
-        elif deletion_type == 6:
-            # Collection deletion (type 6)
-            if "7" in d["1"] and "1" in d["1"]["7"]:
-                return (6, d["1"]["7"]["1"])
-            logging.warning(f"Type 6 deletion with unexpected structure")
-        else:
-            logging.warning(f"Unknown deletion type {deletion_type}")
-            
+        deletion = d["1"]
+        deletion_type = deletion["1"]
+
+        path = _DELETION_PATHS.get(deletion_type)
+        if path is None:
+            if _log.isEnabledFor(logging.DEBUG):
+                _log.debug(f"Unknown deletion type {deletion_type}")
+            return (0, None)
+
+        outer_key, inner_key = path
+        outer = deletion.get(outer_key)
+        if outer is not None and inner_key in outer:
+            return (deletion_type, outer[inner_key])
+        if _log.isEnabledFor(logging.DEBUG):
+            _log.debug(f"Type {deletion_type} deletion with unexpected structure")
+
     except Exception as e:
-        logging.error(f"Error parsing deletion item: {e}")
+        _log.error(f"Error parsing deletion item: {e}")
     
     return (0, None)
 
@@ -158,65 +182,85 @@ def _get_items_list(data: dict, key: str) -> list[dict]:
     return [items] if isinstance(items, dict) else items
 
 
-def parse_db_update(data: dict) -> tuple[str, str | None, list[MediaItem], list[CollectionItem], list[str], list[str]]:
+@dataclass(slots=True)
+class ParsedUpdate:
     """
-    Parse the library state from the raw data.
-    
-    Returns:
-        tuple: (state_token, next_page_token, remote_media, collections, 
-                media_keys_to_delete, collection_keys_to_delete)
+    A parsed library update.
+
+    Tokens are read eagerly, items are parsed lazily by the `*_iter` methods so that
+    media items can be streamed into storage without building an intermediate list.
     """
-    next_page_token = data["1"].get("1", "")
-    state_token = data["1"].get("6", "")
 
-    # Parse media items
-    remote_media = []
-    media_items = _get_items_list(data, "2")
-    for d in media_items:
-        try:
-            remote_media.append(_parse_media_item(d))
-        except Exception as e:
-            # Log the error but continue parsing other items
-            import logging
-            media_key = d.get("1", "unknown")
-            logging.warning(f"Failed to parse media item (key: {media_key}): {type(e).__name__}: {e}")
-            continue
-
-    # Parse collections (albums)
-    collections = []
-    collection_items = _get_items_list(data, "3")
-    for d in collection_items:
-        try:
-            collections.append(_parse_collection_item(d))
-        except Exception as e:
-            # Log the error but continue parsing other items
-            import logging
-            collection_key = d.get("1", "unknown")
-            logging.warning(f"Failed to parse collection item (key: {collection_key}): {type(e).__name__}: {e}")
-            continue
-
-    # Parse deletions (both media items and collections)
-    media_keys_to_delete = []
-    collection_keys_to_delete = []
-    deletions = _get_items_list(data, "9")
-    for d in deletions:
-        try:
-            deletion_type, item_key = _parse_deletion_item(d)
-            if item_key:
-                if deletion_type == 1:
-                    # Media item deletion
-                    media_keys_to_delete.append(item_key)
-                elif deletion_type in (2, 4, 6):
-                    # Collection deletion (type 2 is the primary collection deletion type)
-                    collection_keys_to_delete.append(item_key)
-        except Exception as e:
-            # Log the error but continue parsing other deletions
-            import logging
-            deletion_type_raw = d.get("1", {}).get("1", "unknown")
-            logging.warning(f"Failed to parse deletion item (type: {deletion_type_raw}): {type(e).__name__}: {e}")
+    state_token: str
+    next_page_token: str | None
+    data: dict
+
+    def media_iter(self) -> Iterator[MediaItem]:
+        """Yield the media items in the update, skipping items that fail to parse."""
+        # Kept serial on purpose: parsing costs ~10 µs per item, several times less than pickling
+        # the raw dicts and resulting MediaItems to and from worker processes
+        for d in _get_items_list(self.data, "2"):
+            try:
+                yield _parse_media_item(d)
+            except Exception as e:
+                # Log the error but continue parsing other items
+                media_key = d.get("1", "unknown")
+                _log.warning(f"Failed to parse media item (key: {media_key}): {type(e).__name__}: {e}")
+
+    def collection_iter(self) -> Iterator[CollectionItem]:
+        """Yield the collections (albums) in the update, skipping items that fail to parse."""
+        for d in _get_items_list(self.data, "3"):
+            try:
+                yield _parse_collection_item(d)
+            except Exception as e:
+                # Log the error but continue parsing other items
+                collection_key = d.get("1", "unknown")
+                _log.warning(f"Failed to parse collection item (key: {collection_key}): {type(e).__name__}: {e}")
+
+    def deletion_iter(self) -> Iterator[tuple[int, str]]:
+        """Yield (deletion_type, item_key) for each deletion (both media items and collections) in the update."""
+        for d in _get_items_list(self.data, "9"):
+            try:
+                deletion_type, item_key = _parse_deletion_item(d)
+                if item_key:
+                    yield deletion_type, item_key
+            except Exception as e:
+                # Log the error but continue parsing other deletions
+                deletion_type_raw = d.get("1", {}).get("1", "unknown")
+                _log.warning(f"Failed to parse deletion item (type: {deletion_type_raw}): {type(e).__name__}: {e}")
+
+    def deletions(self) -> tuple[list[str], list[str]]:
+        """
+        Split the deletions in the update by item kind.
 
+        Returns:
+            tuple: (media_keys_to_delete, collection_keys_to_delete)
+        """
+        media_keys_to_delete = []
+        collection_keys_to_delete = []
+        for deletion_type, item_key in self.deletion_iter():
+            if deletion_type == 1:
+                # Media item deletion
+                media_keys_to_delete.append(item_key)
+            else:
+                # Every other type in _DELETION_PATHS is a collection deletion
+                collection_keys_to_delete.append(item_key)
+        return media_keys_to_delete, collection_keys_to_delete
+
+
+def parse_db_update(data: dict) -> ParsedUpdate:
+    """
+    Parse the library state from the raw data.
+
+    Returns:
+        ParsedUpdate: State tokens of the update, with lazy access to its items.
+    """
     # envelopes = _get_items_list(data, "12")
     # for d in envelopes:
     #     _parse_envelope_item(d)
 
-    return state_token, next_page_token, remote_media, collections, media_keys_to_delete, collection_keys_to_delete
+    return ParsedUpdate(
+        state_token=data["1"].get("6", ""),
+        next_page_token=data["1"].get("1", ""),
+        data=data,
+    )
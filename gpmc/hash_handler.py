@@ -21,6 +21,8 @@ def calculate_sha1_hash(file_path: Path, progress: Progress, file_progress_id: T
 
     hash_sha1 = hashlib.sha1()
 
+    # hashlib releases the GIL while hashing large chunks, so files hashed by concurrent
+    # upload threads already use multiple cores without the cost of a process pool
     with progress.open(file_path, "rb", task_id=file_progress_id) as file:
         for chunk in iter(lambda: file.read(1024 * 1024), b""):
             hash_sha1.update(chunk)
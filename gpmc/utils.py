@@ -1,14 +1,27 @@
 import logging
 import struct
+from itertools import islice
+from typing import Iterable, Iterator, TypeVar
 
 from rich.logging import RichHandler
 
+T = TypeVar("T")
+
 
 def urlsafe_base64(base64_hash: str) -> str:
     """Convert Base64 str to URL-safe Base64 string."""
     return base64_hash.replace("+", "-").replace("/", "_").rstrip("=")
 
 
+def batched(iterable: Iterable[T], n: int) -> Iterator[list[T]]:
+    """Yield successive lists of up to `n` items from `iterable` (backport of `itertools.batched`)."""
+    if n < 1:
+        raise ValueError("n must be at least one")
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, n)):
+        yield batch
+
+
 def create_logger(log_level: str) -> logging.Logger:
     """Create rich logger"""
     logging.basicConfig(
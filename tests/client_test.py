@@ -4,17 +4,25 @@ from gpmc import Client, utils
 
 
 class TestUpload(unittest.TestCase):
-    def setUp(self):
-        self.image_file_path = "media/image.png"
-        self.image_sha1_hash_b64 = "bjvmULLYvkVj8jWVQFu1Pl98hYA="
-        self.image_sha1_hash_hxd = "6e3be650b2d8be4563f23595405bb53e5f7c8580"
-        self.directory_path = "C:/Users/admin/Pictures"
-        self.mkv_file_path = "media/sample_640x360.mkv"
-        self.client = Client()
+    image_file_path = "media/image.png"
+    image_sha1_hash_b64 = "bjvmULLYvkVj8jWVQFu1Pl98hYA="
+    image_sha1_hash_hxd = "6e3be650b2d8be4563f23595405bb53e5f7c8580"
+    dedup_key_b64 = utils.urlsafe_base64(image_sha1_hash_b64)
+    directory_path = "C:/Users/admin/Pictures"
+    mkv_file_path = "media/sample_640x360.mkv"
+
+    @classmethod
+    def setUpClass(cls):
+        # One client for the whole class, so auth and cache state are set up once
+        cls.client = Client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.client.api.close()
+
     def test_restore_from_trash(self):
         """Test restore from trash."""
-        dedup_key = utils.urlsafe_base64(self.image_sha1_hash_b64)
-        output = self.client.api.restore_from_trash([dedup_key])
+        output = self.client.api.restore_from_trash([self.dedup_key_b64])
         print(output)
 
     def test_get_download_urls(self):
@@ -24,13 +32,11 @@ class TestUpload(unittest.TestCase):
 
     def test_set_archived(self):
         """Test get library data."""
-        dedup_key = utils.urlsafe_base64(self.image_sha1_hash_b64)
-        self.client.api.set_archived([dedup_key], is_archived=False)
+        self.client.api.set_archived([self.dedup_key_b64], is_archived=False)
 
     def test_set_favorite(self):
         """Test get library data."""
-        dedup_key = utils.urlsafe_base64(self.image_sha1_hash_b64)
-        self.client.api.set_favorite(dedup_key, is_favorite=False)
+        self.client.api.set_favorite(self.dedup_key_b64, is_favorite=False)
 
     def test_get_thumbnail(self):
         """Test get library data."""
@@ -42,8 +48,7 @@ class TestUpload(unittest.TestCase):
 
     def test_set_caption(self):
         """Test filter."""
-        dedup_key = utils.urlsafe_base64(self.image_sha1_hash_b64)
-        self.client.api.set_item_caption(dedup_key=dedup_key, caption="foobar")
+        self.client.api.set_item_caption(dedup_key=self.dedup_key_b64, caption="foobar")
 
     def test_filter(self):
         """Test filter."""
@@ -109,13 +114,14 @@ class TestUpload(unittest.TestCase):
         
         # Retrieve collections from the database
         print("\n=== Retrieving collections from database ===")
-        with Storage(self.client.db_path) as storage:
-            # Get all collections
-            collections = storage.get_collections()
+        with Storage.open_readonly(self.client.db_path) as storage:
+            # Only the first 5 collections are loaded, the total comes from a COUNT query
+            collection_count = storage.collection_count()
+            collections = list(storage.iter_collections(limit=5))
             
             if collections:
-                print(f"\nFound {len(collections)} collection(s):")
-                for i, collection in enumerate(collections[:5], 1):  # Show first 5
+                print(f"\nFound {collection_count} collection(s):")
+                for i, collection in enumerate(collections, 1):
                     print(f"\n{i}. {collection.title}")
                     print(f"   - Collection Media Key: {collection.collection_media_key}")
                     print(f"   - Album ID: {collection.collection_album_id}")
@@ -125,8 +131,8 @@ class TestUpload(unittest.TestCase):
                     if collection.cover_item_media_key:
                         print(f"   - Cover Item: {collection.cover_item_media_key}")
                 
-                if len(collections) > 5:
-                    print(f"\n... and {len(collections) - 5} more collection(s)")
+                if collection_count > 5:
+                    print(f"\n... and {collection_count - 5} more collection(s)")
                 
                 # Test retrieving a specific collection
                 if collections:
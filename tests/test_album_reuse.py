@@ -7,24 +7,31 @@ import unittest
 import tempfile
 import os
 from pathlib import Path
-from gpmc.db import Storage
+from gpmc.db import Storage, _GET_COLLECTION_BY_TITLE_SQL
 from gpmc.models import CollectionItem
 
 
 class TestAlbumReuse(unittest.TestCase):
     """Test album reuse functionality."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create a temporary database file
-        self.tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
-        self.db_path = self.tmp_file.name
-        self.tmp_file.close()
+    @classmethod
+    def setUpClass(cls):
+        """Create a temporary database shared by all tests in the class."""
+        tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        cls.db_path = tmp_file.name
+        tmp_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Close pooled connections and remove the temporary database."""
+        Storage.close_all()
+        if os.path.exists(cls.db_path):
+            os.unlink(cls.db_path)
 
-    def tearDown(self):
-        """Clean up test fixtures."""
-        if os.path.exists(self.db_path):
-            os.unlink(self.db_path)
+    def setUp(self):
+        """Start each test from an empty cache."""
+        with Storage(self.db_path) as storage:
+            storage.reset()
 
     def test_get_collection_by_title_not_found(self):
         """Test get_collection_by_title when collection doesn't exist."""
@@ -60,6 +67,8 @@ class TestAlbumReuse(unittest.TestCase):
             self.assertEqual(result.collection_media_key, 'test_key_123')
             self.assertEqual(result.title, 'Test Album')
             self.assertEqual(result.total_items, 5)
+            # Slotted dataclass, no per-instance __dict__
+            self.assertFalse(hasattr(result, '__dict__'))
 
     def test_get_collection_by_title_multiple_with_same_name(self):
         """Test get_collection_by_title returns most recent when multiple exist."""
@@ -124,5 +133,131 @@ class TestAlbumReuse(unittest.TestCase):
             self.assertIsNone(result)
 
 
+    def test_update_collections_skips_unchanged_rows(self):
+        """Test that re-upserting identical collections doesn't rewrite them."""
+        collection = CollectionItem(
+            collection_media_key='key_1',
+            collection_album_id='album_1',
+            title='Album',
+            total_items=5,
+            type=1,
+            sort_order=0,
+            is_custom_ordered=False
+        )
+
+        with Storage(self.db_path) as storage:
+            storage.update_collections([collection])
+
+            changes = storage.conn.total_changes
+            storage.update_collections([collection])
+            self.assertEqual(storage.conn.total_changes, changes)
+
+            # A changed field, including one going to NULL, is still written
+            collection.total_items = 6
+            collection.cover_item_media_key = 'cover'
+            storage.update_collections([collection])
+            collection.cover_item_media_key = None
+            storage.update_collections([collection])
+            self.assertEqual(storage.conn.total_changes, changes + 2)
+
+            result = storage.get_collection_by_title('Album')
+            self.assertEqual(result.total_items, 6)
+            self.assertIsNone(result.cover_item_media_key)
+
+    def test_get_collection_by_title_after_changes(self):
+        """Test that title lookups reflect collection changes made through the same storage."""
+        collection = CollectionItem(
+            collection_media_key='key_1',
+            collection_album_id='album_1',
+            title='Album',
+            total_items=5,
+            type=1,
+            sort_order=0,
+            is_custom_ordered=False,
+            last_activity_time_ms=1000
+        )
+
+        with Storage(self.db_path) as storage:
+            self.assertIsNone(storage.get_collection_by_title('Album'))
+            storage.update_collections([collection])
+            self.assertEqual(storage.get_collection_by_title('Album').collection_media_key, 'key_1')
+
+            # A newer album with the same title takes over
+            newer = CollectionItem(
+                collection_media_key='key_2',
+                collection_album_id='album_2',
+                title='Album',
+                total_items=1,
+                type=1,
+                sort_order=0,
+                is_custom_ordered=False,
+                last_activity_time_ms=2000
+            )
+            storage.update_collections([newer])
+            self.assertEqual(storage.get_collection_by_title('Album').collection_media_key, 'key_2')
+
+            storage.delete_collections(['key_2'])
+            self.assertEqual(storage.get_collection_by_title('Album').collection_media_key, 'key_1')
+
+            storage.reset()
+            self.assertIsNone(storage.get_collection_by_title('Album'))
+
+    def test_get_collection_by_title_sees_nested_writes(self):
+        """Test that title lookups see collections written and deleted by a nested storage."""
+        collection = CollectionItem(
+            collection_media_key='key_1',
+            collection_album_id='album_1',
+            title='Album',
+            total_items=5,
+            type=1,
+            sort_order=0,
+            is_custom_ordered=False
+        )
+
+        with Storage(self.db_path) as outer:
+            self.assertIsNone(outer.get_collection_by_title('Album'))
+
+            with Storage(self.db_path) as inner:
+                inner.update_collections([collection])
+            self.assertEqual(outer.get_collection_by_title('Album').collection_media_key, 'key_1')
+
+            with Storage(self.db_path) as inner:
+                inner.delete_collections(['key_1'])
+            self.assertIsNone(outer.get_collection_by_title('Album'))
+
+    def test_iter_collections_limit_and_count(self):
+        """Test that collections are listed most recent first, limited, and counted."""
+        collections = [
+            CollectionItem(
+                collection_media_key=f'key_{i}',
+                collection_album_id=f'album_{i}',
+                title=f'Album {i}',
+                total_items=1,
+                type=1,
+                sort_order=0,
+                is_custom_ordered=False,
+                last_activity_time_ms=i
+            )
+            for i in range(10)
+        ]
+
+        with Storage(self.db_path) as storage:
+            storage.update_collections(collections)
+
+            self.assertEqual(storage.collection_count(), 10)
+            recent = [c.collection_media_key for c in storage.iter_collections(limit=3)]
+            self.assertEqual(recent, ['key_9', 'key_8', 'key_7'])
+            self.assertEqual(len(storage.get_collections()), 10)
+
+    def test_get_collection_by_title_uses_index(self):
+        """Test that the title lookup is an index seek, with no full scan or separate sort."""
+        with Storage(self.db_path) as storage:
+            plan = storage.conn.execute(f"EXPLAIN QUERY PLAN {_GET_COLLECTION_BY_TITLE_SQL}", ('Album',)).fetchall()
+        # Only check stable parts of the plan, older SQLite versions word it differently
+        details = ' '.join(row[-1] for row in plan)
+        self.assertIn('ix_collections_title_time', details)
+        self.assertNotIn('SCAN', details)
+        self.assertNotIn('USE TEMP B-TREE', details)
+
 if __name__ == '__main__':
     unittest.main()
@@ -5,6 +5,8 @@ This test verifies that albums are properly reused after cache initialization.
 import unittest
 import tempfile
 import os
+import sqlite3
+import threading
 from pathlib import Path
 from gpmc.db import Storage
 from gpmc.models import CollectionItem
@@ -13,17 +15,24 @@ from gpmc.models import CollectionItem
 class TestAlbumReuseIntegration(unittest.TestCase):
     """Test album reuse with cache initialization."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create a temporary database file
-        self.tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
-        self.db_path = self.tmp_file.name
-        self.tmp_file.close()
+    @classmethod
+    def setUpClass(cls):
+        """Create a temporary database shared by all tests in the class."""
+        tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        cls.db_path = tmp_file.name
+        tmp_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Close pooled connections and remove the temporary database."""
+        Storage.close_all()
+        if os.path.exists(cls.db_path):
+            os.unlink(cls.db_path)
 
-    def tearDown(self):
-        """Clean up test fixtures."""
-        if os.path.exists(self.db_path):
-            os.unlink(self.db_path)
+    def setUp(self):
+        """Start each test from an empty cache."""
+        with Storage(self.db_path) as storage:
+            storage.reset()
 
     def test_album_lookup_after_cache_update(self):
         """Test that albums can be found after cache is updated."""
@@ -54,20 +63,49 @@ class TestAlbumReuseIntegration(unittest.TestCase):
             self.assertEqual(result.collection_media_key, 'existing_key_123')
 
     def test_nested_storage_access(self):
-        """Test that we can't open storage while it's already open."""
-        # This test documents the issue with nested storage access
+        """Test that a nested storage on the same file sees and shares the outer storage's state."""
         with Storage(self.db_path) as storage1:
             storage1.set_init_state(0)
             
-            # This should work - we can open another connection
+            # Nested storages reuse the outer connection
             with Storage(self.db_path) as storage2:
                 storage2.set_init_state(1)
             
-            # After closing storage2, storage1 should see the update
-            # But this might not work as expected due to isolation
-            init_state = storage1.get_init_state()
-            # The value might still be 0 due to transaction isolation
-            # This is a potential issue
+            # After closing storage2, storage1 sees the update
+            self.assertTrue(storage1.get_init_state())
+
+    def test_init_state_read_once(self):
+        """Test that the init state is only queried once per storage."""
+        with Storage(self.db_path) as storage:
+            storage.set_init_state(1)
+
+        with Storage(self.db_path) as storage:
+            statements = []
+            storage.conn.set_trace_callback(statements.append)
+            self.assertTrue(storage.get_init_state())
+            self.assertTrue(storage.get_init_state())
+            storage.conn.set_trace_callback(None)
+            self.assertEqual(sum('init_complete' in sql for sql in statements), 1)
+
+            storage.reset()
+            self.assertFalse(storage.get_init_state())
+
+    def test_init_state_set_by_other_thread(self):
+        """Test that a storage opened after another thread sets the init state sees the new value."""
+        def set_init_state():
+            with Storage(self.db_path) as storage:
+                storage.set_init_state(1)
+
+        with Storage(self.db_path) as outer:
+            self.assertFalse(outer.get_init_state())
+
+            thread = threading.Thread(target=set_init_state)
+            thread.start()
+            thread.join()
+
+            # A nested storage reuses the connection but reads the state again
+            with Storage(self.db_path) as nested:
+                self.assertTrue(nested.get_init_state())
 
     def test_sequential_storage_access(self):
         """Test that sequential storage access sees updates correctly."""
@@ -97,5 +135,69 @@ class TestAlbumReuseIntegration(unittest.TestCase):
             self.assertEqual(result.collection_media_key, 'test_key')
 
 
+    def test_storage_connection_reused(self):
+        """Test that nested storages on the same file share one connection, closed by the outermost."""
+        statements = []
+        with Storage(self.db_path) as storage1:
+            storage1.conn.set_trace_callback(statements.append)
+            with Storage(self.db_path) as storage2:
+                self.assertIs(storage1.conn, storage2.conn)
+            # Closing the nested storage keeps the connection open
+            storage1.conn.execute("SELECT 1")
+            self.assertNotIn("PRAGMA optimize", statements)
+
+        # The last storage to close optimizes and closes the connection
+        self.assertIn("PRAGMA optimize", statements)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            storage1.conn.execute("SELECT 1")
+        # Closing again is a no-op
+        storage2.close()
+
+        with Storage(self.db_path) as storage3:
+            self.assertIsNot(storage3.conn, storage1.conn)
+            self.assertFalse(storage3.get_init_state())
+
+        # In-memory databases are never shared
+        with Storage(":memory:") as memory1, Storage(":memory:") as memory2:
+            self.assertIsNot(memory1.conn, memory2.conn)
+
+    def test_storage_connection_settings(self):
+        """Test that storage connections use WAL with a relaxed sync mode and a larger page cache."""
+        with Storage(self.db_path) as storage:
+            self.assertEqual(storage.conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(storage.conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(storage.conn.execute("PRAGMA cache_size").fetchone()[0], -65536)
+            self.assertEqual(storage.conn.execute("PRAGMA temp_store").fetchone()[0], 2)  # MEMORY
+
+    def test_readonly_storage_access(self):
+        """Test that a read-only storage sees committed data and rejects writes."""
+        test_collection = CollectionItem(
+            collection_media_key='test_key',
+            collection_album_id='test_album',
+            title='Test Album',
+            total_items=5,
+            type=1,
+            sort_order=0,
+            is_custom_ordered=False
+        )
+        with Storage(self.db_path) as storage:
+            storage.update_collections([test_collection])
+
+            # Read-only access works while a writer connection is open
+            with Storage.open_readonly(self.db_path) as readonly:
+                result = readonly.get_collection_by_title('Test Album')
+                self.assertIsNotNone(result)
+                self.assertEqual(result.collection_media_key, 'test_key')
+
+                with self.assertRaises(sqlite3.OperationalError):
+                    readonly.set_init_state(1)
+
+    def test_readonly_storage_missing_file(self):
+        """Test that opening a missing database read-only fails instead of creating it."""
+        missing_path = self.db_path + '.missing'
+        with self.assertRaises(sqlite3.OperationalError):
+            Storage.open_readonly(missing_path)
+        self.assertFalse(os.path.exists(missing_path))
+
 if __name__ == '__main__':
     unittest.main()
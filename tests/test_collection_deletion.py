@@ -18,17 +18,24 @@ from gpmc.models import CollectionItem
 class TestCollectionDeletion(unittest.TestCase):
     """Test collection deletion functionality."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        # Create a temporary database file
-        self.tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
-        self.db_path = self.tmp_file.name
-        self.tmp_file.close()
+    @classmethod
+    def setUpClass(cls):
+        """Create a temporary database shared by all tests in the class."""
+        tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.db')
+        cls.db_path = tmp_file.name
+        tmp_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Close pooled connections and remove the temporary database."""
+        Storage.close_all()
+        if os.path.exists(cls.db_path):
+            os.unlink(cls.db_path)
 
-    def tearDown(self):
-        """Clean up test fixtures."""
-        if os.path.exists(self.db_path):
-            os.unlink(self.db_path)
+    def setUp(self):
+        """Start each test from an empty cache."""
+        with Storage(self.db_path) as storage:
+            storage.reset()
 
     def test_delete_collections_single(self):
         """Test deleting a single collection."""
@@ -202,6 +209,35 @@ class TestCollectionDeletion(unittest.TestCase):
             self.assertEqual(collections[0].collection_media_key, 'media_key_2')
             self.assertEqual(collections[0].collection_album_id, 'album_id_2')
 
+    def test_delete_collections_more_keys_than_parameter_limit(self):
+        """Test deleting more keys than SQLite allows as bound parameters in one statement."""
+        collections = [
+            CollectionItem(
+                collection_media_key=f'key_{i}',
+                collection_album_id=f'album_{i}',
+                title=f'Album {i}',
+                total_items=1,
+                type=1,
+                sort_order=0,
+                is_custom_ordered=False
+            )
+            for i in range(20000)
+        ]
+
+        with Storage(self.db_path) as storage:
+            storage.update_collections(collections)
+
+        # Delete every key except the last one, mixing media keys and album ids
+        with Storage(self.db_path) as storage:
+            storage.delete_collections(
+                [f'key_{i}' for i in range(0, 19999, 2)] + [f'album_{i}' for i in range(1, 19999, 2)]
+            )
+
+        with Storage(self.db_path) as storage:
+            collections = storage.get_collections()
+            self.assertEqual(len(collections), 1)
+            self.assertEqual(collections[0].collection_media_key, 'key_19999')
+
 
 if __name__ == '__main__':
     unittest.main()
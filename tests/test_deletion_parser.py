@@ -81,6 +81,24 @@ class TestDeletionParser(unittest.TestCase):
         self.assertEqual(deletion_type, 0)
         self.assertIsNone(item_key)
 
+    def test_parse_deletion_unexpected_structure(self):
+        """Test parsing a known deletion type without the item key."""
+        deletion_data = {
+            "1": {
+                "1": 1,
+                "2": {}
+            }
+        }
+        deletion_type, item_key = _parse_deletion_item(deletion_data)
+        self.assertEqual(deletion_type, 0)
+        self.assertIsNone(item_key)
+
+    def test_parse_deletion_malformed(self):
+        """Test parsing a deletion item without a type."""
+        deletion_type, item_key = _parse_deletion_item({})
+        self.assertEqual(deletion_type, 0)
+        self.assertIsNone(item_key)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,172 @@
+"""
+Test for media item parsing functionality.
+"""
+import sys
+from pathlib import Path
+
+# Add parent directory to path to allow direct execution
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from gpmc.db import Storage
+from gpmc.db_update_parser import _parse_media_item, parse_db_update
+
+
+def _make_media_item_data() -> dict:
+    """Build a minimal raw media item as decoded from the library state response."""
+    return {
+        "1": "media_key_123",
+        "2": {
+            "1": {"1": "collection_id_123"},
+            "3": "A caption",
+            "4": "IMG_0001.jpg",
+            "5": [{"1": 1}, {"1": 2}],
+            "7": 1700000000000,
+            "8": 3600000,
+            "9": 1700000001000,
+            "10": 123456,
+            "11": 1,
+            "13": {"1": b"\x6e\x3b\xe6\x50\xb2\xd8\xbe\x45\x63\xf2\x35\x95\x40\x5b\xb5\x3e\x5f\x7c\x85\x80"},
+            "16": {},
+            "21": {"1": "dedup_key_123"},
+            "26": 42,
+            "29": {"1": 0},
+            "30": {"1": 1},
+            "31": {"1": 1},
+            "35": {"2": 1000, "3": 2},
+            "39": {"1": 0},
+        },
+        "5": {
+            "1": 1,
+            "2": {
+                "1": {
+                    "1": "https://example.com/photo",
+                    "9": {
+                        "1": 4032,
+                        "2": 3024,
+                        "5": {"1": "Google", "2": "Pixel XL", "4": 1072064102, "6": 100},
+                    },
+                },
+            },
+        },
+        "17": {},
+    }
+
+
+class TestMediaItemParser(unittest.TestCase):
+    """Test media item parsing."""
+
+    def test_parse_photo(self):
+        """Test parsing a photo with EXIF data."""
+        item = _parse_media_item(_make_media_item_data())
+        self.assertEqual(item.media_key, "media_key_123")
+        self.assertEqual(item.file_name, "IMG_0001.jpg")
+        self.assertEqual(item.dedup_key, "dedup_key_123")
+        self.assertEqual(item.caption, "A caption")
+        self.assertTrue(item.is_canonical)
+        self.assertEqual(item.origin, "self")
+        self.assertTrue(item.is_favorite)
+        self.assertFalse(item.is_archived)
+        self.assertTrue(item.is_original_quality)
+        self.assertEqual(item.remote_url, "https://example.com/photo")
+        self.assertEqual((item.width, item.height), (4032, 3024))
+        self.assertEqual((item.make, item.model, item.iso), ("Google", "Pixel XL", 100))
+        self.assertAlmostEqual(item.aperture, 1.8, places=5)
+        self.assertIsNone(item.shutter_speed)
+        self.assertFalse(item.is_edited)
+        # Slotted dataclass, no per-instance __dict__
+        self.assertFalse(hasattr(item, "__dict__"))
+
+    def test_parse_dedup_key_from_hash(self):
+        """Test dedup_key falls back to the URL-safe Base64 SHA-1 hash."""
+        data = _make_media_item_data()
+        data["2"]["21"] = {"1": {"1": 5}}
+        item = _parse_media_item(data)
+        self.assertEqual(item.dedup_key, "bjvmULLYvkVj8jWVQFu1Pl98hYA")
+
+    def test_parse_alt_typed_fields(self):
+        """Test fields stored under blackboxprotobuf alternate type keys."""
+        data = _make_media_item_data()
+        data["2"]["21"] = {"1-1": "dedup_key_alt"}
+        del data["2"]["3"]
+        data["2"]["3-1"] = "Alt caption"
+        item = _parse_media_item(data)
+        self.assertEqual(item.dedup_key, "dedup_key_alt")
+        self.assertEqual(item.caption, "Alt caption")
+
+    def test_parse_without_caption(self):
+        """Test that a missing caption is not confused with other "3*" fields."""
+        data = _make_media_item_data()
+        del data["2"]["3"]
+        item = _parse_media_item(data)
+        self.assertIsNone(item.caption)
+
+    def test_parse_non_canonical(self):
+        """Test items with property 27 are not canonical."""
+        data = _make_media_item_data()
+        data["2"]["5"] = [{"1": 1}, {"1": 27}]
+        item = _parse_media_item(data)
+        self.assertFalse(item.is_canonical)
+
+    def test_parse_video(self):
+        """Test parsing a video."""
+        data = _make_media_item_data()
+        data["5"] = {
+            "1": 2,
+            "3": {
+                "2": {"1": "https://example.com/video"},
+                "4": {"1": 5000, "4": 1920, "5": 1080},
+                "6": {"4": 4629137466983448576},
+            },
+        }
+        item = _parse_media_item(data)
+        self.assertEqual(item.remote_url, "https://example.com/video")
+        self.assertEqual((item.duration, item.width, item.height), (5000, 1920, 1080))
+        self.assertEqual(item.capture_frame_rate, 30.0)
+        self.assertIsNone(item.encoded_frame_rate)
+
+    def test_parse_micro_video(self):
+        """Test parsing a photo with an embedded micro video."""
+        data = _make_media_item_data()
+        data["5"]["5"] = {"2": {"4": {"1": 1500, "4": 1440, "5": 1080}}}
+        item = _parse_media_item(data)
+        self.assertTrue(item.is_micro_video)
+        self.assertEqual(item.duration, 1500)
+        self.assertEqual((item.micro_video_width, item.micro_video_height), (1440, 1080))
+
+    def test_parse_location(self):
+        """Test parsing location data."""
+        data = _make_media_item_data()
+        data["17"] = {"1": {"1": 525200000, "2": 4294967296 - 134050000}, "5": {"2": {"1": "Berlin"}, "3": "loc_1"}}
+        item = _parse_media_item(data)
+        self.assertAlmostEqual(item.latitude, 52.52)
+        self.assertAlmostEqual(item.longitude, -13.405)
+        self.assertEqual((item.location_name, item.location_id), ("Berlin", "loc_1"))
+
+
+    def test_parse_db_update_streams_into_storage(self):
+        """Test that parsed media items stream into storage, skipping unparseable ones."""
+        second = _make_media_item_data()
+        second["1"] = "media_key_456"
+        broken = {"1": "media_key_broken"}
+        data = {
+            "1": {
+                "1": "next_page",
+                "6": "state",
+                "2": [_make_media_item_data(), broken, second],
+                "9": [{"1": {"1": 1, "2": {"1": "deleted_media"}}}, {"1": {"1": 4, "5": {"2": "deleted_album"}}}],
+            }
+        }
+        update = parse_db_update(data)
+        self.assertEqual((update.state_token, update.next_page_token), ("state", "next_page"))
+        self.assertEqual(update.deletions(), (["deleted_media"], ["deleted_album"]))
+        self.assertEqual(list(update.collection_iter()), [])
+
+        with Storage(":memory:") as storage:
+            self.assertEqual(storage.update(update.media_iter(), batch_size=1), 2)
+            keys = [row[0] for row in storage.conn.execute("SELECT media_key FROM remote_media ORDER BY media_key")]
+        self.assertEqual(keys, ["media_key_123", "media_key_456"])
+
+
+if __name__ == '__main__':
+    unittest.main()